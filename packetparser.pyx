@@ -0,0 +1,94 @@
+# cython: language_level=3, boundscheck=False, wraparound=False
+# Compiled versions of the receive.py line parsing functions, same behaviour
+# Build with: cythonize -i -3 packetparser.pyx
+
+cdef str PACKET_MARKER = 'packet:'
+
+# Maps a sensor key parsed from a packet to one shared interned copy, same keys as receive.SENSOR_FIELDS
+cdef dict SENSOR_KEY_NAMES = {key: key for key in ('t1', 't2', 'p', 'h', 'ax', 'ay', 'az', 'gx', 'gy', 'gz')}
+
+cdef inline bint is_packet_id_char(Py_UCS4 c):
+    return c == '.' or ('0' <= c <= '9')
+
+cpdef tuple parse_packet_line(str line_str):
+    """Splits a packet line into (data_string, rssi, length), returns None if it is not a packet line.
+    rssi and length are None if not present."""
+    cdef Py_ssize_t n = len(line_str)
+    cdef Py_ssize_t i = line_str.find(PACKET_MARKER)
+    cdef Py_ssize_t quote_end
+    cdef str data_string, field, key, value
+    cdef object rssi = None
+    cdef object length = None
+    if i < 0:
+        return None
+    i += len(PACKET_MARKER)
+    while i < n and line_str[i].isspace():
+        i += 1
+    if i >= n or line_str[i] != '"':
+        return None
+    quote_end = line_str.find('"', i + 1)
+    if quote_end < 0:
+        return None
+
+    data_string = line_str[i + 1:quote_end]
+    i = quote_end + 1
+    if i < n and line_str[i] == ',':
+        for field in line_str[i + 1:].split(','):
+            key, _, value = field.partition(':')
+            key = key.strip()
+            if key == 'rssi':
+                rssi = value.strip()
+            elif key == 'length':
+                length = value.strip()
+    return data_string, rssi, length
+
+cpdef tuple split_packet_id(str data_string):
+    """Splits "ID - data" into (packet_id, data_content), returns None if the ID is missing."""
+    cdef Py_ssize_t n = len(data_string)
+    cdef Py_ssize_t i = 0
+    cdef Py_ssize_t id_start, id_end
+    while i < n and data_string[i].isspace():
+        i += 1
+    id_start = i
+    while i < n and is_packet_id_char(data_string[i]):
+        i += 1
+    id_end = i
+    if id_end == id_start:
+        return None
+    while i < n and data_string[i].isspace():
+        i += 1
+    if i >= n or data_string[i] != '-':
+        return None
+    i += 1
+    while i < n and data_string[i].isspace():
+        i += 1
+    return data_string[id_start:id_end], data_string[i:]
+
+cpdef dict parse_sensor_fields(str data_content):
+    """Parses "key:valueUNIT;..." into a dictionary of floats, values that are not numbers are kept as strings."""
+    cdef dict data_dict = {}
+    cdef str part, key, sep, value_str, cleaned_value_str
+    cdef Py_ssize_t n
+    cdef Py_UCS4 last
+    for part in data_content.split(';'):
+        key, sep, value_str = part.partition(':')
+        if not sep:
+            continue
+        key = key.strip()
+        key = SENSOR_KEY_NAMES.get(key, key)
+        value_str = value_str.strip()
+        # Remove common units (C, hPa, %) and convert to float
+        n = len(value_str)
+        cleaned_value_str = value_str
+        if n:
+            last = value_str[n - 1]
+            if last == 'C' or last == '%':
+                cleaned_value_str = value_str[:n - 1]
+            elif last == 'a' and value_str.endswith('hPa'):
+                cleaned_value_str = value_str[:n - 3]
+        try:
+            data_dict[key] = float(cleaned_value_str)
+        except ValueError:
+            # Keep as string if conversion fails
+            data_dict[key] = value_str
+    return data_dict
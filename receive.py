@@ -1,31 +1,87 @@
 import serial
 import serial.tools.list_ports
-import datetime
 import sys
 import time
+import errno
+import io
 import json
-import re
-import os # Needed for checking file existence
+import math
+import mmap
+import os # Needed for low level log file access
+import queue
+import selectors
+import signal
+import threading
+import numpy as np
+
+try:
+    import orjson # Faster JSON encoder, optional
+except ImportError:
+    orjson = None
+
+try:
+    import packetparser # Compiled line parser, optional, build with: cythonize -i -3 packetparser.pyx
+except ImportError:
+    packetparser = None
 
 # --- Configuration ---
 BAUD_RATE = 115200  # Set your desired baud rate here
-SENSOR_LOG_FILE = "sensorlog.json"
-GPS_LOG_FILE = "gpslog.json"
+SERIAL_TIMEOUT = 0.5 # Seconds to wait for serial data before returning empty
+SERIAL_READ_SIZE = 4096 # Maximum bytes taken from the serial port per read
+SENSOR_LOG_FILE = "sensorlog.bin" # Fixed size SENSOR_DTYPE records, appended as packets arrive
+GPS_LOG_FILE = "gpslog.jsonl" # One JSON record per line, appended as packets arrive
+LOG_GROWTH_SIZE = 1 << 20 # Log files are memory mapped and grown in steps of this many bytes
+LOG_SYNC_INTERVAL = 0.5 # Seconds between flushing new data in the mapped log files to disk
+VERBOSE = '-v' in sys.argv or '--verbose' in sys.argv # Print every packet instead of a summary
+REPORT_INTERVAL = 1.0 # Seconds between packet count summaries when not verbose
 # --- End Configuration ---
 
-# --- Regular Expressions for Parsing ---
-# Matches the overall line structure, capturing the data inside quotes, optional rssi, optional length
+# --- Line Format ---
+# Lines carry the data inside quotes, with optional rssi and length after it
 # Example: [timestamp] packet: "DATA_STRING", rssi: -4, length: 128
-# Groups: 1=DATA_STRING, 2=RSSI_VALUE(optional), 3=LENGTH_VALUE(optional)
-LINE_REGEX = re.compile(r'packet:\s*\"(.*?)\"(?:,\s*rssi:\s*(-?\d+))?(?:,\s*length:\s*(\d+))?')
-
-# Matches the packet ID and the rest of the data string
+# The data string starts with the packet ID
 # Example: "0.06 - t1:24.70C;..." or "0.05 - gps:msg:..."
-# Groups: 1=PACKET_ID, 2=REST_OF_DATA
-DATA_SPLIT_REGEX = re.compile(r'^\s*([\d\.]+)\s*-\s*(.*)$')
+PACKET_MARKER = 'packet:'
+PACKET_ID_CHARS = '0123456789.'
+
+# Known sensor keys, in the order they are stored in the sensor log
+SENSOR_FIELDS = ('t1', 't2', 'p', 'h', 'ax', 'ay', 'az', 'gx', 'gy', 'gz')
+SENSOR_KEYS = frozenset(SENSOR_FIELDS)
+# Maps a sensor key parsed from a packet to one shared interned copy
+SENSOR_KEY_NAMES = {sys.intern(key): sys.intern(key) for key in SENSOR_FIELDS}
+
+# Sensor values are stored as int16 fixed point, value * scale
+# Temperatures in 0.01 C, pressure in 0.1 hPa, humidity in 0.01 %
+SENSOR_SCALES = {
+    'rssi': 1, 'length': 1,
+    't1': 100, 't2': 100, 'p': 10, 'h': 100,
+    'ax': 100, 'ay': 100, 'az': 100,
+    'gx': 10, 'gy': 10, 'gz': 10,
+}
+# int16 columns of a sensor log record, in storage order, pack_sensor_record writes them in this order
+SENSOR_COLUMNS = ('rssi', 'length') + SENSOR_FIELDS
+SENSOR_MISSING = -32768 # Stored for missing or unparseable values
+SENSOR_LIMIT = 32767 # Values outside +-SENSOR_LIMIT are clipped
+
+# Layout of one sensor log record
+# Read a log back with read_sensor_log(), raw np.fromfile rows may include zero padding (ts == 0)
+SENSOR_DTYPE = np.dtype(
+    [('ts', '<u8'), # Receive time, milliseconds since the epoch
+     ('pid', '<f4')]
+    + [(key, '<i2') for key in SENSOR_COLUMNS]
+)
 
 # --- Helper Functions ---
 
+if orjson is not None:
+    def dumps_json_record(record):
+        """Serializes a record to UTF-8 JSON bytes."""
+        return orjson.dumps(record)
+else:
+    def dumps_json_record(record):
+        """Serializes a record to UTF-8 JSON bytes."""
+        return json.dumps(record).encode('utf-8')
+
 def list_serial_ports():
     """ Lists serial port names compatible with Windows"""
     # (Code identical to the previous version - keeping it for completeness)
@@ -46,23 +102,155 @@ def list_serial_ports():
         available_ports.append(port_info.device)
     return available_ports
 
-def parse_sensor_data(packet_id, data_content, rssi, length, timestamp):
-    """Parses the sensor data string and returns a dictionary."""
+def parse_packet_line(line_str):
+    """Splits a packet line into (data_string, rssi, length), returns None if it is not a packet line.
+    rssi and length are None if not present."""
+    marker_pos = line_str.find(PACKET_MARKER)
+    if marker_pos < 0:
+        return None
+    rest = line_str[marker_pos + len(PACKET_MARKER):].lstrip()
+    if not rest.startswith('"'):
+        return None
+    quote_end = rest.find('"', 1)
+    if quote_end < 0:
+        return None
+
+    data_string = rest[1:quote_end]
+    rssi = None
+    length = None
+    tail = rest[quote_end + 1:]
+    if tail.startswith(','):
+        for field in tail[1:].split(','):
+            key, _, value = field.partition(':')
+            key = key.strip()
+            if key == 'rssi':
+                rssi = value.strip()
+            elif key == 'length':
+                length = value.strip()
+    return data_string, rssi, length
+
+def split_packet_id(data_string):
+    """Splits "ID - data" into (packet_id, data_content), returns None if the ID is missing."""
+    packet_id, sep, data_content = data_string.partition('-')
+    packet_id = packet_id.strip()
+    if not sep or not packet_id or packet_id.strip(PACKET_ID_CHARS):
+        return None
+    return packet_id, data_content.lstrip()
+
+def parse_sensor_fields(data_content):
+    """Parses "key:valueUNIT;..." into a dictionary of floats, values that are not numbers are kept as strings."""
     data_dict = {}
+    for part in data_content.split(';'):
+        key, sep, value_str = part.partition(':')
+        if not sep:
+            continue # handle parts without ':' if needed
+        key = key.strip()
+        key = SENSOR_KEY_NAMES.get(key, key)
+        value_str = value_str.strip()
+        # Remove common units (C, hPa, %) and convert to float
+        if value_str.endswith(('C', '%')):
+            cleaned_value_str = value_str[:-1]
+        elif value_str.endswith('hPa'):
+            cleaned_value_str = value_str[:-3]
+        else:
+            cleaned_value_str = value_str
+        try:
+            data_dict[key] = float(cleaned_value_str)
+        except ValueError:
+            # Keep as string if conversion fails
+            data_dict[key] = value_str
+    return data_dict
+
+if packetparser is not None:
+    # Same behaviour as the functions above, compiled
+    parse_packet_line = packetparser.parse_packet_line
+    split_packet_id = packetparser.split_packet_id
+    parse_sensor_fields = packetparser.parse_sensor_fields
+
+def sensor_unit_length(value_str):
+    """Returns the length of the unit parse_sensor_fields strips from value_str."""
+    if value_str.endswith(('C', '%')):
+        return 1
+    if value_str.endswith('hPa'):
+        return 3
+    return 0
+
+def compile_sensor_layout(data_content):
+    """Generates a parser specialised to the key order and units of data_content.
+
+    The generated function returns the same dictionary as parse_sensor_fields, or None if a
+    packet does not have exactly this layout. Returns None if data_content is not suitable,
+    e.g. because a value is not a number."""
     parts = data_content.split(';')
-    for part in parts:
-        if ':' in part:
-            key, value_str = part.split(':', 1)
-            key = key.strip()
-            value_str = value_str.strip()
-            # Remove common units and convert to float
-            cleaned_value_str = re.sub(r'(?:C|hPa|%)$', '', value_str)
-            try:
-                data_dict[key] = float(cleaned_value_str)
-            except ValueError:
-                # Keep as string if conversion fails
-                data_dict[key] = value_str
-        # else: handle parts without ':' if needed
+    checks = []
+    values = []
+    for i, part in enumerate(parts):
+        key, sep, value_str = part.partition(':')
+        if not sep:
+            checks.append(f"':' not in p{i}")
+            continue
+        if key != key.strip() or value_str != value_str.strip():
+            return None
+        unit_length = sensor_unit_length(value_str)
+        try:
+            float(value_str[:len(value_str) - unit_length])
+        except ValueError:
+            return None
+        prefix = key + ':'
+        checks.append(f"p{i}.startswith({prefix!r})")
+        if unit_length:
+            checks.append(f"p{i}.endswith({value_str[-unit_length:]!r})")
+        value_end = f"-{unit_length}" if unit_length else ""
+        values.append(f"{key!r}: float(p{i}[{len(prefix)}:{value_end}])")
+
+    # Keys and units only ever enter the source through repr()
+    src = "\n".join([
+        "def parse_fixed(data_content):",
+        "    parts = data_content.split(';')",
+        f"    if len(parts) != {len(parts)}:",
+        "        return None",
+        f"    {''.join(f'p{i}, ' for i in range(len(parts)))}= parts",
+        f"    if not ({' and '.join(checks) or 'True'}):",
+        "        return None",
+        "    try:",
+        f"        return {{{', '.join(values)}}}",
+        "    except ValueError:",
+        "        return None",
+    ])
+    namespace = {}
+    exec(compile(src, "<sensor layout>", "exec"), namespace)
+    return namespace["parse_fixed"]
+
+def no_sensor_layout(data_content):
+    """Stands in for the specialised parser when a packet could not be specialised, always misses."""
+    return None
+
+SENSOR_LAYOUT_RETRY = 32 # Consecutive misses after which the layout is learned again from the next packet
+
+# Specialised parser for the current sensor packet layout, None until a layout has been tried
+_fixed_sensor_parser = None
+_fixed_sensor_misses = 0
+
+def parse_sensor_fields_fixed(data_content):
+    """Parses sensor fields with the specialised parser, falls back to parse_sensor_fields on a layout mismatch."""
+    global _fixed_sensor_parser, _fixed_sensor_misses
+    if _fixed_sensor_parser is not None:
+        data_dict = _fixed_sensor_parser(data_content)
+        if data_dict is not None:
+            _fixed_sensor_misses = 0
+            return data_dict
+        _fixed_sensor_misses += 1
+        if _fixed_sensor_misses >= SENSOR_LAYOUT_RETRY:
+            _fixed_sensor_parser = None # Layout changed or was never specialisable, learn again
+        return parse_sensor_fields(data_content)
+    data_dict = parse_sensor_fields(data_content)
+    _fixed_sensor_parser = compile_sensor_layout(data_content) or no_sensor_layout
+    _fixed_sensor_misses = 0
+    return data_dict
+
+def parse_sensor_data(packet_id, data_content, rssi, length, timestamp):
+    """Parses the sensor data string and returns a dictionary."""
+    data_dict = parse_sensor_fields_fixed(data_content)
 
     json_output = {
         "timestamp": timestamp,
@@ -95,41 +283,311 @@ def parse_gps_data(packet_id, data_content, timestamp):
     # GPS format doesn't seem to include rssi/length based on example
     return json_output
 
-def load_json_data(filename):
-    """Loads data from a JSON file, returns a list or empty list if error/not found."""
-    if not os.path.exists(filename):
-        return []
+def as_float(value):
+    """Converts a parsed value to float, returns NaN if it is missing or not numeric."""
     try:
-        with open(filename, 'r', encoding='utf-8') as f:
-            # Handle empty file case
-            content = f.read()
-            if not content:
-                return []
-            data = json.loads(content)
-            # Ensure it's a list
-            return data if isinstance(data, list) else []
-    except (json.JSONDecodeError, IOError) as e:
-        print(f"Warning: Could not load or parse {filename}. Starting fresh. Error: {e}")
-        # Optionally backup the corrupted file here
-        return []
-
-def save_json_data(filename, data_list):
-    """Saves a list of data to a JSON file."""
+        return float(value)
+    except (TypeError, ValueError):
+        return math.nan
+
+def quantize(value, scale):
+    """Converts a parsed value to int16 fixed point, returns SENSOR_MISSING if it is not a number.
+    Values outside +-SENSOR_LIMIT, including infinities, are clipped."""
+    value = as_float(value)
+    if math.isnan(value):
+        return SENSOR_MISSING
+    # Clip before rounding, a large finite value can still overflow to inf once scaled
+    return round(max(-SENSOR_LIMIT, min(SENSOR_LIMIT, value * scale)))
+
+def pack_sensor_record(parsed_json, received_ns):
+    """Packs a parsed sensor record into the bytes of one SENSOR_DTYPE record."""
+    data = parsed_json["data"]
+    values = (
+        received_ns // 1_000_000,
+        as_float(parsed_json["packet_id"]),
+        quantize(parsed_json.get("rssi"), SENSOR_SCALES['rssi']),
+        quantize(parsed_json.get("length"), SENSOR_SCALES['length']),
+        *(quantize(data.get(key), SENSOR_SCALES[key]) for key in SENSOR_COLUMNS[2:])
+    )
+    return np.array(values, dtype=SENSOR_DTYPE).tobytes()
+
+def dequantize_sensor_records(records):
+    """Converts an array of SENSOR_DTYPE records to a dict of float32 columns, missing values become NaN.
+    Zero padding rows (ts == 0) left by an unclean shutdown are dropped."""
+    records = records[records['ts'] != 0]
+    columns = {'ts': records['ts'], 'pid': records['pid']}
+    for key in SENSOR_COLUMNS:
+        scale = SENSOR_SCALES[key]
+        column = records[key].astype(np.float32) / np.float32(scale)
+        column[records[key] == SENSOR_MISSING] = np.nan
+        columns[key] = column
+    return columns
+
+def read_sensor_log(filename=SENSOR_LOG_FILE):
+    """Reads a sensor log and returns its dequantized columns, see dequantize_sensor_records."""
+    return dequantize_sensor_records(np.fromfile(filename, dtype=SENSOR_DTYPE))
+
+class MmapLog:
+    """Append-only log file written through a memory map.
+
+    The file is preallocated in LOG_GROWTH_SIZE steps and truncated to the written
+    length on close. New data is flushed to disk in one batch every LOG_SYNC_INTERVAL by a
+    background thread, so writes never wait on the disk.
+    After an unclean shutdown the file ends in zero padding until it is reopened, readers
+    such as read_gps_log and read_sensor_log skip it. On reopen the padding is skipped, rounded up to a whole
+    record for fixed size record logs, and a partly written last line is dropped."""
+
+    def __init__(self, filename, record_size=1):
+        self.name = filename
+        self._record_size = record_size
+        self._fd = os.open(filename, os.O_RDWR | os.O_CREAT | getattr(os, 'O_BINARY', 0), 0o644)
+        try:
+            self._offset = self._find_end()
+            stale_end = os.fstat(self._fd).st_size
+            os.ftruncate(self._fd, self._offset + LOG_GROWTH_SIZE)
+            self._mm = mmap.mmap(self._fd, self._offset + LOG_GROWTH_SIZE)
+            # Clear what an unclean shutdown left past the data, so it cannot end up between new records
+            stale_end = min(stale_end, len(self._mm))
+            if stale_end > self._offset:
+                self._mm[self._offset:stale_end] = bytes(stale_end - self._offset)
+        except OSError:
+            os.close(self._fd)
+            raise
+        self._synced_offset = self._offset
+        self._lock = threading.Lock() # Guards the mapping against resize during a flush
+        self._closed = threading.Event()
+        self._sync_thread = threading.Thread(target=self._sync_loop, name=f"sync {filename}", daemon=True)
+        self._sync_thread.start()
+
+    def _find_end(self):
+        """Returns the end of the written data, ignoring zero padding left by an unclean shutdown.
+        For line based logs (record_size 1) a partly written last line is dropped too."""
+        size = os.fstat(self._fd).st_size
+        tail_start = max(0, size - LOG_GROWTH_SIZE)
+        os.lseek(self._fd, tail_start, os.SEEK_SET)
+        tail = os.read(self._fd, size - tail_start).rstrip(b'\0')
+        if self._record_size == 1:
+            if tail and not tail.endswith(b'\n'):
+                tail = tail[:tail.rfind(b'\n') + 1]
+            return tail_start + len(tail)
+        end = tail_start + len(tail)
+        return -(-end // self._record_size) * self._record_size
+
+    def _sync_loop(self):
+        """Flushes new data every LOG_SYNC_INTERVAL until the log is closed, runs on its own thread."""
+        while not self._closed.wait(LOG_SYNC_INTERVAL):
+            try:
+                self._sync()
+            except (OSError, ValueError) as e: # ValueError if the mapping was closed meanwhile
+                print(f"Warning: Could not sync {self.name} to disk. Error: {e}")
+
+    def _sync(self):
+        """Flushes the pages written since the last sync."""
+        with self._lock:
+            if self._closed.is_set():
+                return
+            end = self._offset
+            if end != self._synced_offset:
+                # msync needs a page aligned start
+                start = self._synced_offset - self._synced_offset % mmap.ALLOCATIONGRANULARITY
+                self._mm.flush(start, end - start)
+                self._synced_offset = end
+
+    def write(self, data):
+        end = self._offset + len(data)
+        if end > len(self._mm):
+            with self._lock:
+                self._mm.resize(end + LOG_GROWTH_SIZE)
+        self._mm[self._offset:end] = data
+        self._offset = end
+
+    def close(self):
+        """Flushes the mapping, trims the padding and closes the file with a single fsync."""
+        self._closed.set()
+        self._sync_thread.join()
+        with self._lock:
+            try:
+                self._mm.flush() # On Windows os.fsync does not cover dirty pages still in the view
+                self._mm.close()
+                os.ftruncate(self._fd, self._offset)
+                os.fsync(self._fd)
+            finally:
+                os.close(self._fd)
+
+def open_log_file(filename, record_size=1):
+    """Opens a log file for appending, returns an MmapLog."""
+    return MmapLog(filename, record_size)
+
+def append_json_record(log_file, record):
+    """Appends a single record to an open JSONL log file."""
+    try:
+        log_file.write(dumps_json_record(record) + b'\n')
+    except TypeError as e: # orjson.JSONEncodeError is a TypeError too
+        print(f"Error: Could not serialize data to JSON for {log_file.name}. Error: {e}")
+
+def append_sensor_record(log_file, parsed_json, received_ns):
+    """Appends a single sensor record to an open sensor log file."""
+    log_file.write(pack_sensor_record(parsed_json, received_ns))
+
+def close_log_file(log_file):
+    """Flushes, syncs to disk and closes a log file."""
+    try:
+        log_file.close()
+        print(f"Data successfully saved to {log_file.name}")
+    except OSError as e:
+        print(f"Error: Could not write to {log_file.name}. Error: {e}")
+
+def read_gps_log(filename=GPS_LOG_FILE):
+    """Reads a GPS JSONL log and returns its records as a list.
+
+    Log files are preallocated, so after an unclean shutdown they end in zero padding
+    (trimmed the next time the logger opens them). Reading stops at the padding and
+    at a last record that was only partly written."""
+    records = []
+    with open(filename, 'rb') as f:
+        for line in f:
+            line = line.rstrip(b'\0')
+            if not line:
+                break # Reached the padding
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                break # Partly written last record
+    return records
+
+def stop_on_sigterm(signum, frame):
+    """Turns SIGTERM (e.g. systemctl stop) into a normal exit, so the log files are closed cleanly."""
+    raise SystemExit(0)
+
+# Date and time part of the last formatted timestamp, reused while the second is unchanged
+_timestamp_second = None
+_timestamp_prefix = ''
+
+def format_timestamp(received_ns):
+    """Formats a time.time_ns() value as local "YYYY-MM-DD HH:MM:SS.mmm"."""
+    global _timestamp_second, _timestamp_prefix
+    second, remainder_ns = divmod(received_ns, 1_000_000_000)
+    if second != _timestamp_second:
+        _timestamp_prefix = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(second))
+        _timestamp_second = second
+    return f"{_timestamp_prefix}.{remainder_ns // 1_000_000:03d}"
+
+def serial_selector(ser):
+    """Returns a selector that waits for data on the serial port, or None if the port has no selectable fd (Windows)."""
+    try:
+        fd = ser.fileno()
+    except (AttributeError, io.UnsupportedOperation): # serialwin32 falls through to io.RawIOBase.fileno
+        return None
+    selector = selectors.DefaultSelector()
+    selector.register(fd, selectors.EVENT_READ)
+    return selector
+
+def read_serial_chunk(ser, selector):
+    """Waits up to SERIAL_TIMEOUT for data and returns all bytes available, b'' on timeout."""
+    if not selector.select(timeout=SERIAL_TIMEOUT):
+        return b''
     try:
-        with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(data_list, f, indent=4) # Use indent for readability
-        print(f"Data successfully saved to {filename}")
-    except IOError as e:
-        print(f"Error: Could not write to {filename}. Error: {e}")
-    except TypeError as e:
-        print(f"Error: Could not serialize data to JSON for {filename}. Error: {e}")
+        chunk = os.read(ser.fileno(), SERIAL_READ_SIZE)
+    except OSError as e:
+        # Spurious wakeups on the non-blocking fd, ignored like pyserial does
+        if e.errno in (errno.EAGAIN, errno.EWOULDBLOCK, errno.EINTR):
+            return b''
+        raise serial.SerialException(f"read failed: {e}")
+    if not chunk:
+        raise serial.SerialException("device reports readiness to read but returned no data (device disconnected?)")
+    return chunk
+
+def process_line(line_bytes, received_ns, sensor_log, gps_log):
+    """Parses one received line and appends it to the matching log, returns True if it was logged."""
+    try:
+        line_str = line_bytes.decode('utf-8', errors='replace').strip()
+        if VERBOSE:
+            print(line_str)
+    except UnicodeDecodeError:
+        print(f"Warning: Could not decode bytes: {line_bytes!r}")
+        return False # Skip this line
+
+    if not line_str:
+        return False
+
+    # --- Parsing Logic ---
+    packet_line = parse_packet_line(line_str)
+    if not packet_line:
+        # print(f"Debug: Line did not match main structure: {line_str}")
+        return False # Skip lines not matching the expected "packet: ..." format
+
+    data_string, rssi, length = packet_line # rssi/length will be None if not present
+
+    data_split = split_packet_id(data_string)
+    if not data_split:
+        if VERBOSE:
+            print(f"Debug: Data string part did not match ID split: {data_string}")
+        return False # Skip if format "ID - data" is not found
+
+    packet_id, data_content = data_split
+
+    timestamp = format_timestamp(received_ns)
+    parsed_json = None
+
+    # Decide between Sensor and GPS based on content
+    if 'gps:' in data_content:
+        parsed_json = parse_gps_data(packet_id, data_content, timestamp)
+        if parsed_json:
+            append_json_record(gps_log, parsed_json)
+            if VERBOSE:
+                print(f"GPS Logged: {packet_id}")
+    # Sensor packets start with one of the known sensor keys (add more to SENSOR_FIELDS if needed)
+    elif data_content.partition(':')[0].strip() in SENSOR_KEYS:
+        parsed_json = parse_sensor_data(packet_id, data_content, rssi, length, timestamp)
+        if parsed_json:
+            append_sensor_record(sensor_log, parsed_json, received_ns)
+            if VERBOSE:
+                print(f"Sensor Logged: {packet_id}, RSSI: {rssi}, Len: {length}")
+    elif VERBOSE:
+        print(f"Debug: Unrecognized data content format: {data_content}")
+        # Ignore unrecognized formats for now
+
+    # Optional: Print the parsed JSON to console
+    # if parsed_json:
+    #    print(json.dumps(parsed_json, indent=2))
+    return parsed_json is not None
+
+def log_worker(line_queue, sensor_log, gps_log):
+    """Parses and logs (received_ns, line_bytes) items from line_queue until a None sentinel arrives.
+    Runs on its own thread."""
+    packets_since_last_report = 0
+    last_report = time.monotonic()
+    while True:
+        try:
+            item = line_queue.get(timeout=REPORT_INTERVAL)
+        except queue.Empty:
+            item = ()
+        if item is None:
+            break
+
+        if not VERBOSE:
+            now = time.monotonic()
+            if now - last_report >= REPORT_INTERVAL:
+                if packets_since_last_report:
+                    print(f"Logged {packets_since_last_report} packets in the last {now - last_report:.1f}s")
+                packets_since_last_report = 0
+                last_report = now
+
+        if not item:
+            continue # Nothing received, only report
+        received_ns, line_bytes = item
+        try:
+            if process_line(line_bytes, received_ns, sensor_log, gps_log):
+                packets_since_last_report += 1
+        except Exception as e:
+            print(f"Warning: Could not process line {line_bytes!r}. Error: {e}")
 
 
 # --- Main Execution ---
 
 def main():
-    """Main function to select port, connect, read, parse, and log to JSON."""
-    print("--- Serial JSON Logger ---")
+    """Main function to select port, connect, read, parse, and log sensor data (binary) and GPS data (JSONL)."""
+    print("--- Serial Logger ---")
 
     available_ports = list_serial_ports()
     if not available_ports:
@@ -154,89 +612,65 @@ def main():
     print(f"Logging sensor data to: {SENSOR_LOG_FILE}")
     print(f"Logging GPS data to: {GPS_LOG_FILE}")
     print("--------------------------")
-    print("Loading existing log data...")
 
-    # Load existing data
-    sensor_data_list = load_json_data(SENSOR_LOG_FILE)
-    gps_data_list = load_json_data(GPS_LOG_FILE)
-    print(f"Loaded {len(sensor_data_list)} sensor records and {len(gps_data_list)} GPS records.")
+    # Open log files once, records are appended as they arrive
+    try:
+        sensor_log = open_log_file(SENSOR_LOG_FILE, SENSOR_DTYPE.itemsize)
+        gps_log = open_log_file(GPS_LOG_FILE)
+    except OSError as e:
+        print(f"Error: Could not open log files. Error: {e}")
+        sys.exit(1)
 
     print("Attempting to open port...")
     print("Press Ctrl+C to stop logging and save data.")
 
+    signal.signal(signal.SIGTERM, stop_on_sigterm)
+
     # --- Serial Connection and Logging ---
+    # The serial port is read on this thread, parsing and logging happen on the worker
+    line_queue = queue.SimpleQueue()
+    worker = threading.Thread(target=log_worker, args=(line_queue, sensor_log, gps_log), daemon=True)
+    worker.start()
+
     ser = None
+    selector = None
     try:
-        ser = serial.Serial(selected_port, BAUD_RATE, timeout=1)
+        ser = serial.Serial(selected_port, BAUD_RATE, timeout=SERIAL_TIMEOUT)
+        selector = serial_selector(ser)
         print(f"Successfully opened {selected_port}. Waiting for data...")
 
+        pending = b'' # Start of a line whose end has not arrived yet
         while True:
             try:
-                if ser.in_waiting > 0:
-                    line_bytes = ser.readline()
-                    try:
-                        line_str = line_bytes.decode('utf-8', errors='replace').strip()
-                        print(line_str)
-                    except UnicodeDecodeError:
-                        print(f"Warning: Could not decode bytes: {line_bytes!r}")
-                        continue # Skip this line
-
-                    if not line_str:
-                        continue
-
-                    # --- Parsing Logic ---
-                    line_match = LINE_REGEX.search(line_str)
-                    if not line_match:
-                        # print(f"Debug: Line did not match main structure: {line_str}")
-                        continue # Skip lines not matching the expected "packet: ..." format
-
-                    data_string = line_match.group(1)
-                    rssi = line_match.group(2) # Will be None if not present
-                    length = line_match.group(3) # Will be None if not present
-
-                    data_split_match = DATA_SPLIT_REGEX.match(data_string)
-                    if not data_split_match:
-                        print(f"Debug: Data string part did not match ID split: {data_string}")
-                        continue # Skip if format "ID - data" is not found
-
-                    packet_id = data_split_match.group(1)
-                    data_content = data_split_match.group(2)
-
-                    timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
-                    parsed_json = None
-
-                    # Decide between Sensor and GPS based on content
-                    if 'gps:' in data_content:
-                        parsed_json = parse_gps_data(packet_id, data_content, timestamp)
-                        if parsed_json:
-                           gps_data_list.append(parsed_json)
-                           print(f"GPS Logged: {packet_id}")
-                    # Check for sensor keys (add more if needed)
-                    elif any(key + ':' in data_content for key in ['t1', 't2', 'p', 'h', 'ax', 'ay', 'az', 'gx', 'gy', 'gz']):
-                        parsed_json = parse_sensor_data(packet_id, data_content, rssi, length, timestamp)
-                        if parsed_json:
-                            sensor_data_list.append(parsed_json)
-                            print(f"Sensor Logged: {packet_id}, RSSI: {rssi}, Len: {length}")
-                    else:
-                        print(f"Debug: Unrecognized data content format: {data_content}")
-                        pass # Ignore unrecognized formats for now
-
-                    # Optional: Print the parsed JSON to console
-                    # if parsed_json:
-                    #    print(json.dumps(parsed_json, indent=2))
-
-                time.sleep(0.01) # Prevent high CPU usage
+                if selector is None:
+                    line_bytes = ser.readline() # Blocks until a full line arrives or the timeout expires
+                    if line_bytes:
+                        line_queue.put((time.time_ns(), line_bytes)) # Parsed and logged by the worker thread
+                    continue
+
+                chunk = read_serial_chunk(ser, selector) # Wakes as soon as data arrives
+                if not chunk:
+                    continue # Timed out with no data
+                received_ns = time.time_ns()
+                *line_list, pending = (pending + chunk).split(b'\n')
+                for line_bytes in line_list:
+                    line_queue.put((received_ns, line_bytes)) # Parsed and logged by the worker thread
 
             except serial.SerialException as e:
                 print(f"\n--- Serial Error: {e} ---")
                 print("Port might have been disconnected. Attempting to reconnect...")
+                if selector:
+                    selector.close()
                 if ser and ser.is_open:
                     ser.close()
                 time.sleep(5)
                 try:
                     ser.open()
+                    selector = serial_selector(ser)
+                    pending = b''
                     print("--- Reconnected successfully. Resuming log. ---")
                 except serial.SerialException:
+                    selector = None
                     print("--- Reconnect failed. Stopping log. ---")
                     break # Exit the inner loop on failed reconnect
 
@@ -248,14 +682,20 @@ def main():
     except Exception as e:
         print(f"\n--- An unexpected error occurred: {e} ---")
     finally:
+        if selector:
+            selector.close()
         if ser and ser.is_open:
             ser.close()
             print(f"Serial port {selected_port} closed.")
 
-        # Save data on exit
-        print("\nSaving data to JSON files...")
-        save_json_data(SENSOR_LOG_FILE, sensor_data_list)
-        save_json_data(GPS_LOG_FILE, gps_data_list)
+        # Let the worker log everything already received
+        line_queue.put(None)
+        worker.join()
+
+        # Flush buffered records on exit
+        print("\nSaving data to log files...")
+        close_log_file(sensor_log)
+        close_log_file(gps_log)
         print("Exiting script.")
 
 if __name__ == "__main__":
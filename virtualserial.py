@@ -1,54 +1,91 @@
-import time
-import RPi.GPIO as GPIO
+import queue
+import threading
+import lgpio
 
 VIRTUAL_NOTIFY_LINE = 1
 VIRTUAL_ENABLE_LINE = 7
 VIRTUAL_DATA_LINE = 25
 VIRTUAL_CLOCK_LINE = 24
 
-GPIO.setmode(GPIO.BCM)
-GPIO.setup(VIRTUAL_NOTIFY_LINE, GPIO.IN, pull_up_down=GPIO.PUD_DOWN)
-GPIO.setup(VIRTUAL_ENABLE_LINE, GPIO.OUT)
-GPIO.setup(VIRTUAL_DATA_LINE, GPIO.IN, pull_up_down=GPIO.PUD_DOWN)
-GPIO.setup(VIRTUAL_CLOCK_LINE, GPIO.IN, pull_up_down=GPIO.PUD_DOWN)
+GPIO_CHIPS = (4, 0) # Pi 5 RP1 header is gpiochip4 on older kernels, gpiochip0 on newer ones and other Pis
+NOTIFY_POLL_TIMEOUT = 1.0 # Seconds to wait for a notify edge before re-checking the line
+
+def open_gpio_chip():
+    for chip in GPIO_CHIPS:
+        try:
+            return lgpio.gpiochip_open(chip)
+        except lgpio.error:
+            pass
+    raise RuntimeError(f"Could not open any of gpiochip{GPIO_CHIPS}")
+
+h = open_gpio_chip()
+
+lgpio.gpio_claim_alert(h, VIRTUAL_NOTIFY_LINE, lgpio.RISING_EDGE, lgpio.SET_PULL_DOWN)
+lgpio.gpio_claim_output(h, VIRTUAL_ENABLE_LINE, 0)
+lgpio.gpio_claim_input(h, VIRTUAL_DATA_LINE, lgpio.SET_PULL_DOWN)
+lgpio.gpio_claim_alert(h, VIRTUAL_CLOCK_LINE, lgpio.BOTH_EDGES, lgpio.SET_PULL_DOWN)
+
+# Filled by the edge callbacks, so the reader never polls the notify or clock lines
+received_bits = queue.Queue()
+clock_low = threading.Event()
+notified = threading.Event()
+
+def on_clock_edge(chip, gpio, level, timestamp):
+    if level == 1:
+        received_bits.put(read())
+    elif level == 0:
+        clock_low.set()
+
+def on_notify_rising(chip, gpio, level, timestamp):
+    notified.set()
+
+clock_cb = lgpio.callback(h, VIRTUAL_CLOCK_LINE, lgpio.BOTH_EDGES, on_clock_edge)
+notify_cb = lgpio.callback(h, VIRTUAL_NOTIFY_LINE, lgpio.RISING_EDGE, on_notify_rising)
+
+def clear_received_bits():
+    # Drop bits from stray clock edges, so they cannot shift the next character
+    while True:
+        try:
+            received_bits.get_nowait()
+        except queue.Empty:
+            return
 
 def wait_for_notif():
-    while GPIO.input(VIRTUAL_NOTIFY_LINE) == GPIO.LOW:
-        pass
+    notified.clear()
+    while lgpio.gpio_read(h, VIRTUAL_NOTIFY_LINE) == 0:
+        if notified.wait(NOTIFY_POLL_TIMEOUT):
+            break
+    clear_received_bits()
+
 def enable():
-    GPIO.output(VIRTUAL_ENABLE_LINE, GPIO.HIGH)
+    lgpio.gpio_write(h, VIRTUAL_ENABLE_LINE, 1)
 
 def disable():
-    GPIO.output(VIRTUAL_ENABLE_LINE, GPIO.LOW)
+    lgpio.gpio_write(h, VIRTUAL_ENABLE_LINE, 0)
 
 def read():
-    return GPIO.input(VIRTUAL_DATA_LINE) == GPIO.HIGH
+    return lgpio.gpio_read(h, VIRTUAL_DATA_LINE) == 1
 
-def wait_for_clock_high():
-    while GPIO.input(VIRTUAL_CLOCK_LINE) == GPIO.LOW:
-        pass
+def wait_for_bit():
+    # Bit sampled by on_clock_edge when the sender raised the clock
+    return received_bits.get()
 
 def wait_for_clock_low():
-    while GPIO.input(VIRTUAL_CLOCK_LINE) == GPIO.HIGH:
-        pass
+    clock_low.wait()
 
 
 
-def bool_arr_to_char(bits):
+def read_char():
+    # Bits arrive LSB first, pack them straight into the character code
     c = 0
     for i in range(8):
-        c |= bits[i] << i
-    return chr(c)
-
-def read_char():
-    bits = []
-    for _ in range(8):
+        # Clear before enabling, the falling edge may be handled right after the rising one
+        clock_low.clear()
         enable()
-        wait_for_clock_high()
-        bits.append(read())
+        c |= wait_for_bit() << i
         disable()
         wait_for_clock_low()
-    return bool_arr_to_char(bits)
+    return chr(c)
 
 def read_vuart_string():
     received_data = ""
@@ -70,6 +107,9 @@ def main():
         while True:
             print_received()
     finally:
+        clock_cb.cancel()
+        notify_cb.cancel()
+        lgpio.gpiochip_close(h)
         print("Finished")
 
 if __name__ == "__main__":